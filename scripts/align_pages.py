@@ -4,66 +4,20 @@ Phase 1: Deskew pages based on black border detection.
 Saves deskewed pages for later spine consensus and stitching.
 """
 
+import os
+import json
 import cv2
 import numpy as np
+from multiprocessing import Pool
 from pathlib import Path
 from tqdm import tqdm
 
-def detect_border_angle(img):
-    """
-    Detect rotation angle from black border lines.
-    Returns angle in degrees needed to make borders vertical.
-    """
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray, 50, 150, apertureSize=3)
-
-    lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=100,
-                            minLineLength=100, maxLineGap=10)
-
-    if lines is None:
-        return 0.0
-
-    vertical_angles = []
-    for line in lines:
-        x1, y1, x2, y2 = line[0]
-        length = np.sqrt((x2-x1)**2 + (y2-y1)**2)
-
-        if abs(x2 - x1) < 1:
-            angle = 0
-        else:
-            angle = np.degrees(np.arctan2(x2 - x1, y2 - y1))
-
-        # Near-vertical lines (within 15 degrees)
-        if abs(angle) < 15 and length > 200:
-            vertical_angles.append(angle)
-
-    if not vertical_angles:
-        return 0.0
-
-    return np.median(vertical_angles)
+from _common import PageFeatures, deskew_image, detect_border_angle, load_image, sorted_pages
 
-def deskew_image(img, angle):
-    """Rotate image to correct skew, expanding canvas to avoid cropping."""
-    if abs(angle) < 0.05:
-        return img
-
-    h, w = img.shape[:2]
-    center = (w // 2, h // 2)
-    M = cv2.getRotationMatrix2D(center, angle, 1.0)
-
-    cos = np.abs(M[0, 0])
-    sin = np.abs(M[0, 1])
-    new_w = int(h * sin + w * cos)
-    new_h = int(h * cos + w * sin)
-
-    M[0, 2] += (new_w - w) / 2
-    M[1, 2] += (new_h - h) / 2
-
-    # Use white background for rotation
-    rotated = cv2.warpAffine(img, M, (new_w, new_h),
-                              borderMode=cv2.BORDER_CONSTANT,
-                              borderValue=(255, 255, 255))
-    return rotated
+INPUT_DIR = Path("sources_upscaled")
+OUTPUT_DIR = Path("sources_deskewed")
+# Detected angles, keyed by input page and invalidated by its mtime/size
+ANGLE_CACHE_PATH = OUTPUT_DIR / "angles.json"
 
 def find_content_bounds(img):
     """
@@ -87,18 +41,21 @@ def find_content_bounds(img):
 
     return (x, y, w, h)
 
-def process_page(input_path, output_path, debug=False):
+def process_page(input_path, output_path, debug=False, angle=None):
     """
     Deskew a single page and save it.
+    If angle is given (e.g. from the angle cache), detection is skipped.
     Returns the detected angle.
     """
-    img = cv2.imread(str(input_path))
-    if img is None:
+    try:
+        img = load_image(input_path)
+    except ValueError:
         print(f"  Error: Could not load {input_path}")
         return None
 
     # Detect angle
-    angle = detect_border_angle(img)
+    if angle is None:
+        angle = detect_border_angle(PageFeatures(img))
 
     if debug and abs(angle) > 0.1:
         print(f"  {input_path.name}: angle={angle:.2f}°")
@@ -113,27 +70,78 @@ def process_page(input_path, output_path, debug=False):
     #     margin = 10
     #     deskewed = deskewed[max(0,y-margin):y+h+margin, max(0,x-margin):x+w+margin]
 
-    # Save
-    cv2.imwrite(str(output_path), deskewed)
+    # Save with fast zlib level: level 1 is several times faster than the
+    # default for ~15% more bytes, and the output stays viewable
+    cv2.imwrite(str(output_path), deskewed, [cv2.IMWRITE_PNG_COMPRESSION, 1])
 
     return angle
 
+def init_worker():
+    """Limit OpenCV to one thread per worker; the pool supplies the parallelism."""
+    cv2.setNumThreads(1)
+
+def process_page_worker(task):
+    """
+    Pool entry point: derive the output path and deskew one page.
+    task is (page_path, cached_angle or None); returns (page name, angle).
+    """
+    page_path, cached_angle = task
+    output_path = OUTPUT_DIR / page_path.name.replace("_3.0x", "_deskewed")
+    return page_path.name, process_page(page_path, output_path, angle=cached_angle)
+
+def cache_key(page_path):
+    """Invalidation key for a page: changes whenever the input file does."""
+    stat = page_path.stat()
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+def load_angle_cache():
+    """Load cached angles, or an empty cache if missing or unreadable."""
+    try:
+        with open(ANGLE_CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_angle_cache(cache):
+    """Write the angle cache atomically so an interrupted run can't corrupt it."""
+    tmp_path = ANGLE_CACHE_PATH.with_suffix(".json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, ANGLE_CACHE_PATH)
+
 def main():
-    input_dir = Path("sources_upscaled")
-    output_dir = Path("sources_deskewed")
-    output_dir.mkdir(exist_ok=True)
+    OUTPUT_DIR.mkdir(exist_ok=True)
 
     # Find all pages
-    pages = sorted(input_dir.glob("page*_3.0x.png"))
+    pages = sorted_pages(INPUT_DIR.glob("page*_3.0x.png"))
     print(f"Found {len(pages)} pages to process")
 
-    # Process each page
+    # Reuse angles for pages whose input hasn't changed since the last run
+    cache = load_angle_cache()
+    keys = {page_path.name: cache_key(page_path) for page_path in pages}
+    tasks = []
+    for page_path in pages:
+        entry = cache.get(page_path.name)
+        if entry is not None and entry["key"] == keys[page_path.name]:
+            tasks.append((page_path, entry["angle"]))
+        else:
+            tasks.append((page_path, None))
+    cached_count = sum(angle is not None for _, angle in tasks)
+    if cached_count:
+        print(f"Using cached angles for {cached_count} pages")
+
+    # Pages are independent, so deskew them in parallel.
+    # Leave one core free for the main process and progress bar.
+    worker_count = max(1, (os.cpu_count() or 1) - 1)
     angles = []
-    for page_path in tqdm(pages, desc="Deskewing"):
-        output_path = output_dir / page_path.name.replace("_3.0x", "_deskewed")
-        angle = process_page(page_path, output_path)
-        if angle is not None:
-            angles.append(angle)
+    with Pool(worker_count, initializer=init_worker) as pool:
+        for name, angle in tqdm(pool.imap_unordered(process_page_worker, tasks, chunksize=4),
+                                total=len(tasks), desc="Deskewing"):
+            if angle is not None:
+                angles.append(angle)
+                cache[name] = {"key": keys[name], "angle": float(angle)}
+
+    save_angle_cache(cache)
 
     # Statistics
     angles = np.array(angles)
@@ -143,7 +151,7 @@ def main():
     print(f"  Min:  {np.min(angles):.2f}°")
     print(f"  Max:  {np.max(angles):.2f}°")
 
-    print(f"\nDeskewed pages saved to {output_dir}/")
+    print(f"\nDeskewed pages saved to {OUTPUT_DIR}/")
 
 if __name__ == "__main__":
     main()
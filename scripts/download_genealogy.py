@@ -5,7 +5,10 @@ This is the proper way to get the content - download the original, convert local
 """
 
 import os
+import re
 import sys
+import time
+import shutil
 import subprocess
 import urllib.request
 from pathlib import Path
@@ -15,6 +18,10 @@ OUTPUT_DIR = Path("sources")
 PDF_PATH = OUTPUT_DIR / "genealogy.pdf"
 PDF_URL = "https://upload.wikimedia.org/wikipedia/commons/6/68/Shanghai_%E5%8B%BE%E7%94%AC%E9%AE%91%E6%B0%8F%E5%AE%97%E8%AD%9C.pdf"
 USER_AGENT = "FamilyGenealogyDownloader/1.0 (personal genealogy research)"
+PDFTOPPM_PAGE = re.compile(r"page-(\d+)\.jpg")
+IMAGEMAGICK_PAGE = re.compile(r"page(\d+)\.jpg")
+COPY_BUFFER_SIZE = 1 << 20  # 1 MB reads: ~90 read() calls for the whole PDF
+PROGRESS_INTERVAL = 0.1  # seconds between progress bar redraws
 
 
 def format_bytes(num_bytes: int) -> str:
@@ -27,6 +34,33 @@ def format_bytes(num_bytes: int) -> str:
         return f"{num_bytes / (1024 * 1024):.1f} MB"
 
 
+class ProgressReader:
+    """File-like wrapper that passes every chunk read to a callback."""
+
+    def __init__(self, raw, on_chunk):
+        self.raw = raw
+        self.on_chunk = on_chunk
+
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        if chunk:
+            self.on_chunk(chunk)
+        return chunk
+
+
+def print_progress(downloaded: int, total_size: int):
+    """Redraw the download progress bar in place."""
+    if total_size > 0:
+        progress = downloaded / total_size
+        bar_width = 40
+        filled = int(bar_width * progress)
+        bar = "█" * filled + "░" * (bar_width - filled)
+        sys.stdout.write(f"\r[{bar}] {format_bytes(downloaded)} / {format_bytes(total_size)} ({progress*100:.1f}%)")
+    else:
+        sys.stdout.write(f"\rDownloaded: {format_bytes(downloaded)}")
+    sys.stdout.flush()
+
+
 def download_pdf():
     """Download the PDF file with progress indicator."""
     if PDF_PATH.exists() and PDF_PATH.stat().st_size > 80_000_000:
@@ -44,27 +78,21 @@ def download_pdf():
         with urllib.request.urlopen(request, timeout=300) as response:
             total_size = int(response.headers.get('Content-Length', 0))
             downloaded = 0
-            chunk_size = 8192
+            last_redraw = 0.0
+
+            def on_chunk(chunk):
+                nonlocal downloaded, last_redraw
+                downloaded += len(chunk)
+
+                # Throttle redraws so terminal output doesn't dominate
+                now = time.monotonic()
+                if now - last_redraw >= PROGRESS_INTERVAL:
+                    last_redraw = now
+                    print_progress(downloaded, total_size)
 
             with open(PDF_PATH, 'wb') as f:
-                while True:
-                    chunk = response.read(chunk_size)
-                    if not chunk:
-                        break
-                    f.write(chunk)
-                    downloaded += len(chunk)
-
-                    # Progress bar
-                    if total_size > 0:
-                        progress = downloaded / total_size
-                        bar_width = 40
-                        filled = int(bar_width * progress)
-                        bar = "█" * filled + "░" * (bar_width - filled)
-                        sys.stdout.write(f"\r[{bar}] {format_bytes(downloaded)} / {format_bytes(total_size)} ({progress*100:.1f}%)")
-                        sys.stdout.flush()
-                    else:
-                        sys.stdout.write(f"\rDownloaded: {format_bytes(downloaded)}")
-                        sys.stdout.flush()
+                shutil.copyfileobj(ProgressReader(response, on_chunk), f, COPY_BUFFER_SIZE)
+            print_progress(downloaded, total_size)
 
         print()
         print(f"Downloaded: {format_bytes(PDF_PATH.stat().st_size)}")
@@ -97,36 +125,75 @@ def check_tools():
     return None
 
 
+def get_page_count():
+    """Read the PDF page count with pdfinfo, or None if it is unavailable."""
+    try:
+        result = subprocess.run(["pdfinfo", str(PDF_PATH)],
+                                capture_output=True, text=True, check=True)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+    for line in result.stdout.splitlines():
+        if line.startswith("Pages:"):
+            return int(line.split()[1])
+    return None
+
+
 def convert_with_pdftoppm():
-    """Convert PDF to images using pdftoppm (fastest and best quality)."""
+    """Convert PDF to images using pdftoppm (fastest and best quality).
+
+    pdftoppm renders single-threaded, so the page range is split into one
+    contiguous slice per CPU and each slice is rendered by its own process.
+    The slices write disjoint page numbers, so the outputs never collide.
+    """
     print("Converting PDF to JPEG images using pdftoppm...")
     print("This may take a few minutes...")
     print()
 
+    page_count = get_page_count()
+    jobs = os.cpu_count() or 1
+    if page_count is None:
+        page_ranges = [[]]
+    else:
+        chunk = -(-page_count // jobs)  # ceiling division
+        page_ranges = [["-f", str(first), "-l", str(min(first + chunk - 1, page_count))]
+                       for first in range(1, page_count + 1, chunk)]
+        print(f"Rendering {page_count} pages with {len(page_ranges)} parallel pdftoppm processes")
+
     # pdftoppm outputs to sources/page-001.jpg, page-002.jpg, etc.
-    result = subprocess.run([
+    procs = [subprocess.Popen([
         "pdftoppm",
         "-jpeg",
         "-r", "150",  # 150 DPI - good balance of quality and file size
+        *page_range,
         str(PDF_PATH),
         str(OUTPUT_DIR / "page")
-    ], capture_output=True, text=True)
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True) for page_range in page_ranges]
 
-    if result.returncode != 0:
-        print(f"Error: {result.stderr}")
-        return False
+    failed = False
+    for proc in procs:
+        _, stderr = proc.communicate()
+        if proc.returncode != 0:
+            print(f"Error: {stderr}")
+            failed = True
 
-    # Rename files from page-001.jpg to page1.jpg
-    print("Renaming files...")
-    for f in OUTPUT_DIR.glob("page-*.jpg"):
-        # Extract number from page-001.jpg
-        num = int(f.stem.split("-")[1])
-        new_name = OUTPUT_DIR / f"page{num}.jpg"
-        f.rename(new_name)
+    if failed:
+        return False
 
+    rename_pdftoppm_pages()
     return True
 
 
+def rename_pdftoppm_pages():
+    """Rename files from page-001.jpg to page1.jpg in one directory pass."""
+    print("Renaming files...")
+    with os.scandir(OUTPUT_DIR) as entries:
+        renames = [(entry.path, OUTPUT_DIR / f"page{int(m.group(1))}.jpg")
+                   for entry in entries if (m := PDFTOPPM_PAGE.fullmatch(entry.name))]
+    for src, dst in renames:
+        os.rename(src, dst)
+
+
 def convert_with_imagemagick():
     """Convert PDF to images using ImageMagick (slower but widely available)."""
     print("Converting PDF to JPEG images using ImageMagick...")
@@ -145,12 +212,13 @@ def convert_with_imagemagick():
         print(f"Error: {result.stderr}")
         return False
 
-    # ImageMagick uses 0-indexing, rename to 1-indexed
-    for f in sorted(OUTPUT_DIR.glob("page*.jpg")):
-        num = int(f.stem.replace("page", ""))
-        new_name = OUTPUT_DIR / f"page{num + 1}.jpg"
-        if f != new_name:
-            f.rename(new_name)
+    # ImageMagick uses 0-indexing, rename to 1-indexed. Work from the highest
+    # number down so page{n+1} never clobbers a page not yet renamed.
+    with os.scandir(OUTPUT_DIR) as entries:
+        nums = sorted((int(m.group(1)) for entry in entries
+                       if (m := IMAGEMAGICK_PAGE.fullmatch(entry.name))), reverse=True)
+    for num in nums:
+        os.rename(OUTPUT_DIR / f"page{num}.jpg", OUTPUT_DIR / f"page{num + 1}.jpg")
 
     return True
 
@@ -9,73 +9,19 @@ import cv2
 import numpy as np
 from pathlib import Path
 
-def load_image(path):
-    """Load image as BGR."""
-    img = cv2.imread(str(path))
-    if img is None:
-        raise ValueError(f"Could not load {path}")
-    return img
-
-def detect_border_angle(img, debug=False):
-    """
-    Detect the rotation angle from black border lines.
-    Returns angle in degrees (positive = clockwise rotation needed).
-    """
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray, 50, 150, apertureSize=3)
-
-    lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=100,
-                            minLineLength=100, maxLineGap=10)
-
-    if lines is None:
-        return 0.0
-
-    vertical_angles = []
-    for line in lines:
-        x1, y1, x2, y2 = line[0]
-        length = np.sqrt((x2-x1)**2 + (y2-y1)**2)
-
-        if abs(x2 - x1) < 1:
-            angle = 0
-        else:
-            angle = np.degrees(np.arctan2(x2 - x1, y2 - y1))
-
-        if abs(angle) < 10 and length > 200:
-            vertical_angles.append(angle)
-
-    if not vertical_angles:
-        return 0.0
-
-    median_angle = np.median(vertical_angles)
-
-    if debug:
-        print(f"  Found {len(vertical_angles)} vertical lines, median angle: {median_angle:.2f}°")
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
-    return median_angle
+from _common import (PageFeatures, deskew_image, detect_border_angle, load_image,
+                     run_spreads, spread_tasks)
 
-def deskew_image(img, angle):
-    """Rotate image to correct skew."""
-    if abs(angle) < 0.1:
-        return img
+# Spreads run on a thread pool (see run_spreads); give each thread a couple
+# of OpenCV threads without oversubscribing the machine
+cv2.setNumThreads(2)
 
-    h, w = img.shape[:2]
-    center = (w // 2, h // 2)
-    M = cv2.getRotationMatrix2D(center, angle, 1.0)
-
-    cos = np.abs(M[0, 0])
-    sin = np.abs(M[0, 1])
-    new_w = int(h * sin + w * cos)
-    new_h = int(h * cos + w * sin)
-
-    M[0, 2] += (new_w - w) / 2
-    M[1, 2] += (new_h - h) / 2
-
-    rotated = cv2.warpAffine(img, M, (new_w, new_h),
-                              borderMode=cv2.BORDER_CONSTANT,
-                              borderValue=(255, 255, 255))
-    return rotated
-
-def find_spine_edge(img, side='right', debug=False):
+def find_spine_edge(page, side='right', debug=False):
     """
     Find the spine edge of a page.
     side='right' means spine is on right edge (for right pages)
@@ -83,29 +29,30 @@ def find_spine_edge(img, side='right', debug=False):
 
     Returns x-coordinate of spine edge.
     """
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    h, w = gray.shape
+    h, w = page.gray.shape
 
     # Look for the spine region - it has vertical text and a distinctive pattern
     # The spine is typically at the very edge of the page
 
     if side == 'right':
         # Look at right 20% of image for the spine
-        spine_region = gray[:, int(w * 0.8):]
         offset = int(w * 0.8)
+        spine_region = page.gray[:, offset:]
     else:
         # Look at left 20% of image
-        spine_region = gray[:, :int(w * 0.2)]
         offset = 0
+        spine_region = page.gray[:, :int(w * 0.2)]
 
     # Find dark vertical lines in spine region (the spine text)
     edges = cv2.Canny(spine_region, 50, 150)
 
     # Find the innermost edge of significant content
-    col_sums = np.sum(edges, axis=0)
+    # (cv2.reduce sums into int32 with SIMD instead of NumPy's int64 promotion)
+    col_sums = cv2.reduce(edges, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
 
     # Find where content starts/ends
-    threshold = np.max(col_sums) * 0.1
+    _, max_sum, _, _ = cv2.minMaxLoc(col_sums)
+    threshold = max_sum * 0.1
 
     if side == 'right':
         # Find rightmost significant content
@@ -138,46 +85,84 @@ def extract_spine_strip(img, side, width=80):
 
 def align_spines_vertically(left_spine, right_spine, debug=False):
     """
-    Find vertical offset to align spine strips.
+    Find vertical offset to align grayscale spine strips.
     Returns y_offset to shift left_spine relative to right_spine.
     """
-    # Convert to grayscale
-    left_gray = cv2.cvtColor(left_spine, cv2.COLOR_BGR2GRAY)
-    right_gray = cv2.cvtColor(right_spine, cv2.COLOR_BGR2GRAY)
+    left_gray = left_spine
+    right_gray = right_spine
 
     # Use template matching to find best vertical alignment
-    # Pad right spine to allow for shifts
     h1, w1 = left_gray.shape
     h2, w2 = right_gray.shape
 
     # Take middle portion of each spine for matching
     margin = min(h1, h2) // 4
     left_template = left_gray[margin:-margin, :]
-    right_search = right_gray
-
-    # Match template
-    result = cv2.matchTemplate(right_search, left_template, cv2.TM_CCOEFF_NORMED)
+    template_h = left_template.shape[0]
+
+    # Only search shifts within ±10% of the height: cut the right spine
+    # down to that band instead of correlating against its full height
+    max_shift = h1 // 10
+    band_top = max(0, margin - max_shift)
+    band_bottom = min(h2, margin + template_h + max_shift)
+    right_search = right_gray[band_top:band_bottom, :]
+
+    # Coarse search at 1/4 scale, then refine ±4 px at full resolution
+    small_result = cv2.matchTemplate(cv2.pyrDown(cv2.pyrDown(right_search)),
+                                     cv2.pyrDown(cv2.pyrDown(left_template)),
+                                     cv2.TM_CCOEFF_NORMED)
+    _, _, _, small_loc = cv2.minMaxLoc(small_result)
+    refine_top = max(0, small_loc[1] * 4 - 4)
+    refine_bottom = min(right_search.shape[0], small_loc[1] * 4 + 4 + template_h)
+
+    result = cv2.matchTemplate(right_search[refine_top:refine_bottom], left_template,
+                               cv2.TM_CCOEFF_NORMED)
     _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    match_y = band_top + refine_top + max_loc[1]
 
     # Calculate offset
-    y_offset = margin - max_loc[1]
+    y_offset = margin - match_y
 
     if debug:
         print(f"  Spine alignment: y_offset={y_offset}, match_score={max_val:.3f}")
 
     return y_offset, max_val
 
-def stitch_spread(left_page, right_page, spine_width=60, debug=False):
+def _blend_columns_numpy(left_slab, right_slab, out, spine_width):
+    """Cross-fade left_slab into right_slab column by column, writing into out."""
+    # float64 and round-half-to-even, exactly as blend_columns does
+    alphas = (np.arange(left_slab.shape[1], dtype=np.float64) / spine_width)[None, :, None]
+    blended = left_slab * (1 - alphas) + right_slab * alphas
+    out[:] = np.clip(np.rint(blended), 0, 255).astype(np.uint8)
+
+if njit is not None:
+    # Serial: the slab is only spine_width columns wide, and spreads already
+    # run on a thread pool, which numba's workqueue layer can't nest under
+    @njit(cache=True)
+    def blend_columns(left_slab, right_slab, out, spine_width):
+        """Cross-fade left_slab into right_slab column by column, writing into out."""
+        h, bw, channels = out.shape
+        for y in range(h):
+            for x in range(bw):
+                alpha = x / spine_width
+                for c in range(channels):
+                    v = left_slab[y, x, c] * (1.0 - alpha) + right_slab[y, x, c] * alpha
+                    out[y, x, c] = min(255, np.rint(v))
+else:
+    blend_columns = _blend_columns_numpy
+
+def stitch_spread(left, right, spine_width=60, debug=False):
     """
     Stitch two pages into a spread with aligned spines.
-    left_page goes on the left, right_page goes on the right.
+    left goes on the left, right goes on the right (both PageFeatures).
     """
+    left_page, right_page = left.bgr, right.bgr
     h1, w1 = left_page.shape[:2]
     h2, w2 = right_page.shape[:2]
 
     # Extract spine strips for alignment
-    left_spine = extract_spine_strip(left_page, 'left', spine_width)
-    right_spine = extract_spine_strip(right_page, 'right', spine_width)
+    left_spine = extract_spine_strip(left.gray, 'left', spine_width)
+    right_spine = extract_spine_strip(right.gray, 'right', spine_width)
 
     # Find vertical alignment
     y_offset, match_score = align_spines_vertically(left_spine, right_spine, debug=debug)
@@ -186,7 +171,7 @@ def stitch_spread(left_page, right_page, spine_width=60, debug=False):
     max_h = max(h1, h2) + abs(y_offset)
 
     # Create output canvas
-    spread = np.ones((max_h, w1 + w2 - spine_width, 3), dtype=np.uint8) * 255
+    spread = np.full((max_h, w1 + w2 - spine_width, 3), 255, dtype=np.uint8)
 
     # Calculate placement positions
     if y_offset >= 0:
@@ -202,31 +187,19 @@ def stitch_spread(left_page, right_page, spine_width=60, debug=False):
     # Place right page (excluding spine overlap region)
     spread[right_y:right_y+h2, w1-spine_width//2:w1-spine_width//2+w2] = right_page
 
-    # Blend the spine region
-    blend_width = spine_width
+    # Blend the spine region: cross-fade the overlapping column slabs
+    blend_width = min(spine_width, w2)
     blend_start = w1 - spine_width
-    blend_end = w1
 
-    for x in range(blend_width):
-        alpha = x / blend_width  # 0 to 1
+    left_slab = left_page[max(0, -y_offset):min(h1, max_h-max(0,y_offset)), blend_start:blend_start+blend_width]
+    right_slab = right_page[max(0, y_offset):min(h2, max_h-max(0,-y_offset)), 0:blend_width]
 
-        left_x = w1 - spine_width + x
-        right_x = x
-
-        if left_x < w1 and right_x < w2:
-            left_col = left_page[max(0, -y_offset):min(h1, max_h-max(0,y_offset)), left_x:left_x+1]
-            right_col = right_page[max(0, y_offset):min(h2, max_h-max(0,-y_offset)), right_x:right_x+1]
-
-            # Resize if needed
-            target_h = min(left_col.shape[0], right_col.shape[0])
-            if target_h > 0:
-                left_col = left_col[:target_h]
-                right_col = right_col[:target_h]
-
-                blended = cv2.addWeighted(left_col, 1-alpha, right_col, alpha, 0)
-
-                out_y_start = max(left_y, right_y)
-                spread[out_y_start:out_y_start+target_h, blend_start+x:blend_start+x+1] = blended
+    # Match heights
+    target_h = min(left_slab.shape[0], right_slab.shape[0])
+    if target_h > 0:
+        out_y_start = max(left_y, right_y)
+        out_slab = spread[out_y_start:out_y_start+target_h, blend_start:blend_start+blend_width]
+        blend_columns(left_slab[:target_h], right_slab[:target_h], out_slab, spine_width)
 
     return spread
 
@@ -241,21 +214,26 @@ def process_spread(right_page_path, left_page_path, output_path, debug=False):
     print(f"Processing: {right_page_path.name} + {left_page_path.name}")
 
     # Load images
-    right_img = load_image(right_page_path)
-    left_img = load_image(left_page_path)
+    right = PageFeatures(load_image(right_page_path))
+    left = PageFeatures(load_image(left_page_path))
 
     if debug:
-        print(f"  Sizes: right={right_img.shape}, left={left_img.shape}")
+        print(f"  Sizes: right={right.bgr.shape}, left={left.bgr.shape}")
 
     # Detect and apply rotation
-    right_angle = detect_border_angle(right_img, debug=debug)
-    left_angle = detect_border_angle(left_img, debug=debug)
+    right_angle = detect_border_angle(right, debug=debug)
+    left_angle = detect_border_angle(left, debug=debug)
 
-    right_deskewed = deskew_image(right_img, right_angle)
-    left_deskewed = deskew_image(left_img, left_angle)
+    # Features are only recomputed for pages that were actually rotated
+    right_deskewed = deskew_image(right.bgr, right_angle)
+    if right_deskewed is not right.bgr:
+        right = PageFeatures(right_deskewed)
+    left_deskewed = deskew_image(left.bgr, left_angle)
+    if left_deskewed is not left.bgr:
+        left = PageFeatures(left_deskewed)
 
     # Stitch with spine alignment
-    spread = stitch_spread(left_deskewed, right_deskewed, spine_width=80, debug=debug)
+    spread = stitch_spread(left, right, spine_width=80, debug=debug)
 
     if debug:
         print(f"  Output size: {spread.shape}")
@@ -271,12 +249,7 @@ def main():
     output_dir = Path("spreads")
     output_dir.mkdir(exist_ok=True)
 
-    # Test with pages 1003 (right) and 1004 (left)
-    right_page = base_dir / "page1003_3.0x.png"
-    left_page = base_dir / "page1004_3.0x.png"
-    output = output_dir / "spread_1003_1004.png"
-
-    process_spread(right_page, left_page, output, debug=True)
+    run_spreads(process_spread, spread_tasks(base_dir, output_dir), debug=True)
 
 if __name__ == "__main__":
     main()
@@ -9,84 +9,56 @@ import cv2
 import numpy as np
 from pathlib import Path
 
-def detect_border_angle(img):
-    """Detect rotation angle from black border lines."""
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray, 50, 150, apertureSize=3)
-    lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=100,
-                            minLineLength=100, maxLineGap=10)
-    if lines is None:
-        return 0.0
-
-    vertical_angles = []
-    for line in lines:
-        x1, y1, x2, y2 = line[0]
-        length = np.sqrt((x2-x1)**2 + (y2-y1)**2)
-        if abs(x2 - x1) < 1:
-            angle = 0
-        else:
-            angle = np.degrees(np.arctan2(x2 - x1, y2 - y1))
-        if abs(angle) < 15 and length > 200:
-            vertical_angles.append(angle)
-
-    return np.median(vertical_angles) if vertical_angles else 0.0
-
-def deskew_image(img, angle):
-    """Rotate image to correct skew."""
-    if abs(angle) < 0.05:
-        return img
-    h, w = img.shape[:2]
-    center = (w // 2, h // 2)
-    M = cv2.getRotationMatrix2D(center, angle, 1.0)
-    cos, sin = np.abs(M[0, 0]), np.abs(M[0, 1])
-    new_w = int(h * sin + w * cos)
-    new_h = int(h * cos + w * sin)
-    M[0, 2] += (new_w - w) / 2
-    M[1, 2] += (new_h - h) / 2
-    return cv2.warpAffine(img, M, (new_w, new_h),
-                          borderMode=cv2.BORDER_CONSTANT,
-                          borderValue=(255, 255, 255))
-
-def find_spine_boundary(img, side='right', threshold=200):
+from _common import (PageFeatures, deskew_image, detect_border_angle, load_image,
+                     run_spreads, spread_tasks)
+
+# Spreads run on a thread pool (see run_spreads); give each thread a couple
+# of OpenCV threads without oversubscribing the machine
+cv2.setNumThreads(2)
+
+def find_spine_boundary(page, side='right', threshold=200):
     """
     Find where the spine/content boundary is.
     For right page: find where spine starts on right edge
     For left page: find where content starts on left edge
     """
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    gray = page.gray
     h, w = gray.shape
 
-    # Look at edge region
+    # Look at edge region: count dark pixels in each of the ~200 edge columns
+    # (cv2.reduce sums into int32 with SIMD), ordered from the edge inward
     if side == 'right':
-        # Scan from right edge inward to find dark vertical line (border)
-        for x in range(w - 1, w - 200, -1):
-            col = gray[:, x]
-            if np.mean(col < threshold) > 0.3:  # Found dark column
-                return x
-        return w - 100  # Default
+        edge = gray[:, max(w - 199, 0):]
     else:
-        # Scan from left edge inward
-        for x in range(0, 200):
-            col = gray[:, x]
-            if np.mean(col < threshold) > 0.3:
-                return x
-        return 100  # Default
-
-def stitch_pages(right_page, left_page, overlap=40):
+        edge = gray[:, :200]
+    _, mask = cv2.threshold(edge, threshold - 1, 1, cv2.THRESH_BINARY_INV)
+    dark_counts = cv2.reduce(mask, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
+    if side == 'right':
+        dark_counts = dark_counts[::-1]
+    dark = dark_counts > 0.3 * h
+
+    # First dark column from the edge is the border
+    if not dark.any():
+        return w - 100 if side == 'right' else 100  # Default
+    idx = int(dark.argmax())
+    return w - 1 - idx if side == 'right' else idx
+
+def stitch_pages(right, left, overlap=40):
     """
-    Stitch two pages into a spread.
+    Stitch two pages (PageFeatures) into a spread.
     Layout: [left_page] | [spine/overlap] | [right_page]
 
     The right page's right edge (spine) becomes the center.
     """
+    right_page, left_page = right.bgr, left.bgr
     h1, w1 = left_page.shape[:2]
     h2, w2 = right_page.shape[:2]
 
     # Find spine boundaries
     # Right page: spine is on the right edge
-    right_spine_x = find_spine_boundary(right_page, 'right')
+    right_spine_x = find_spine_boundary(right, 'right')
     # Left page: find where to trim on left
-    left_trim_x = find_spine_boundary(left_page, 'left')
+    left_trim_x = find_spine_boundary(left, 'left')
 
     print(f"  Right page spine boundary: x={right_spine_x} (width={w2})")
     print(f"  Left page trim boundary: x={left_trim_x}")
@@ -120,25 +92,33 @@ def process_spread(right_path, left_path, output_path):
     print(f"Processing: {right_path.name} (right) + {left_path.name} (left)")
 
     # Load
-    right_img = cv2.imread(str(right_path))
-    left_img = cv2.imread(str(left_path))
-
-    if right_img is None or left_img is None:
+    try:
+        right_img = load_image(right_path)
+        left_img = load_image(left_path)
+    except ValueError:
         print(f"  Error loading images")
         return None
 
     print(f"  Sizes: right={right_img.shape}, left={left_img.shape}")
 
+    right = PageFeatures(right_img)
+    left = PageFeatures(left_img)
+
     # Deskew
-    right_angle = detect_border_angle(right_img)
-    left_angle = detect_border_angle(left_img)
+    right_angle = detect_border_angle(right)
+    left_angle = detect_border_angle(left)
     print(f"  Angles: right={right_angle:.2f}°, left={left_angle:.2f}°")
 
+    # Features are only recomputed for pages that were actually rotated
     right_deskewed = deskew_image(right_img, right_angle)
+    if right_deskewed is not right_img:
+        right = PageFeatures(right_deskewed)
     left_deskewed = deskew_image(left_img, left_angle)
+    if left_deskewed is not left_img:
+        left = PageFeatures(left_deskewed)
 
     # Stitch
-    spread = stitch_pages(right_deskewed, left_deskewed)
+    spread = stitch_pages(right, left)
     print(f"  Output size: {spread.shape}")
 
     # Save
@@ -152,12 +132,7 @@ def main():
     output_dir = Path("spreads")
     output_dir.mkdir(exist_ok=True)
 
-    # Test with 1003 (right) + 1004 (left)
-    right_page = base_dir / "page1003_3.0x.png"
-    left_page = base_dir / "page1004_3.0x.png"
-    output = output_dir / "spread_1003_1004.png"
-
-    process_spread(right_page, left_page, output)
+    run_spreads(process_spread, spread_tasks(base_dir, output_dir))
 
 if __name__ == "__main__":
     main()
@@ -4,10 +4,21 @@ Stitch pages with spine template fill-in.
 Aligns based on thin spine border lines and fills missing spine content.
 """
 
+import os
 import cv2
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from multiprocessing import Pool
 from pathlib import Path
 
+try:
+    from numba import njit, prange, set_num_threads
+except ImportError:
+    njit = None
+
+from _common import deskew_image, deskew_matrix, detect_border_angle_projection, spread_tasks
+
 # Target dimensions for all spreads (height x width)
 TARGET_HEIGHT = 1596
 TARGET_WIDTH = 2333
@@ -19,6 +30,12 @@ SPINE_UNSCALED_WIDTH = 51
 SPINE_LEFT_THIN_LINE = 4   # x position of left thin line in unscaled spine
 SPINE_RIGHT_THIN_LINE = 47  # x position of right thin line in unscaled spine
 
+# Tilts below this move the page edges by about a pixel, so pages that are
+# already straight skip the deskew and reuse their detection grayscale.
+# Deliberately tighter than _common.DESKEW_MIN_ANGLE, the coarser cutoff
+# used by the whole-page deskew scripts
+STRAIGHT_PAGE_ANGLE = 0.05
+
 def get_average_yellow_color(img):
     """Get the average yellow/paper color from the margin areas of an image.
 
@@ -26,29 +43,32 @@ def get_average_yellow_color(img):
     filtering to only include pixels that are clearly yellowish paper.
     """
     h, w = img.shape[:2]
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
     # Find approximate border positions to sample OUTSIDE the black borders
     # Sample from the outer edge strips where yellow paper should be
     # Use thin strips at very edge where yellow margin should be
-    samples = []
-
-    # Top edge strip (first 5 rows)
-    samples.append(img[0:5, 20:w-20])
-    # Bottom edge strip (last 5 rows)
-    samples.append(img[h-5:h, 20:w-20])
-    # Left edge strip (first 5 columns, middle vertically)
-    samples.append(img[20:h-20, 0:5])
-    # Right edge strip (last 5 columns, middle vertically)
-    samples.append(img[20:h-20, w-5:w])
+    samples = [
+        img[0:5, 20:w-20],      # Top edge strip (first 5 rows)
+        img[h-5:h, 20:w-20],    # Bottom edge strip (last 5 rows)
+        img[20:h-20, 0:5],      # Left edge strip (first 5 columns, middle vertically)
+        img[20:h-20, w-5:w],    # Right edge strip (last 5 columns, middle vertically)
+    ]
 
-    all_samples = np.concatenate([s.reshape(-1, 3) for s in samples], axis=0)
+    # Copy the strips straight into one preallocated pixel list
+    all_samples = np.empty((sum(s.shape[0] * s.shape[1] for s in samples), 3), dtype=np.uint8)
+    offset = 0
+    for s in samples:
+        n = s.shape[0] * s.shape[1]
+        all_samples[offset:offset + n].reshape(s.shape)[:] = s
+        offset += n
 
     # Filter to keep only yellowish pixels:
     # - Not too dark (brightness > 180 to exclude black border pixels)
     # - Not pure white (brightness < 245)
     # - Yellowish hue: B channel < G channel (yellow paper has more green than blue)
-    brightness = np.mean(all_samples, axis=1)
+    # Brightness is the luma of the samples viewed as a 1xN image, so one
+    # SIMD cvtColor pass replaces the per-pixel channel mean
+    brightness = cv2.cvtColor(all_samples[None], cv2.COLOR_BGR2GRAY)[0]
     b_channel = all_samples[:, 0]
     g_channel = all_samples[:, 1]
 
@@ -59,52 +79,54 @@ def get_average_yellow_color(img):
 
     mask = brightness_mask & color_mask
 
-    if np.sum(mask) > 0:
+    count = np.count_nonzero(mask)
+    if count > 0:
         yellow_pixels = all_samples[mask]
-        return np.mean(yellow_pixels, axis=0).astype(np.uint8)
+        return (yellow_pixels.sum(axis=0, dtype=np.uint32) // count).astype(np.uint8)
 
     # Fallback: just use brightness filter if color filter finds nothing
-    if np.sum(brightness_mask) > 0:
-        return np.mean(all_samples[brightness_mask], axis=0).astype(np.uint8)
+    count = np.count_nonzero(brightness_mask)
+    if count > 0:
+        return (all_samples[brightness_mask].sum(axis=0, dtype=np.uint32) // count).astype(np.uint8)
 
     return np.array([180, 200, 210], dtype=np.uint8)  # Default yellowish BGR
 
 def tint_spine_yellow(spine, yellow_color):
     """Tint the spine image with yellow color to match page paper."""
     # Calculate how much to darken: white (255) should become yellow_color
-    # Multiply each channel by (yellow_color / 255)
-    tint_factor = yellow_color.astype(np.float32) / 255.0
+    # Multiply each channel by (yellow_color / 255), as a per-channel
+    # 256-entry lookup table so the image stays uint8 throughout
+    lut = (np.arange(256, dtype=np.int32)[None, :] * yellow_color.astype(np.int32)[:, None]) // 255
+    lut = lut.astype(np.uint8)  # shape (3, 256); values never exceed 255
 
-    # Apply tint - darken proportionally
-    tinted = spine.astype(np.float32)
+    tinted = np.empty_like(spine)
     for c in range(3):
-        tinted[:, :, c] = tinted[:, :, c] * tint_factor[c]
-
-    # Clip to valid range
-    tinted = np.clip(tinted, 0, 255).astype(np.uint8)
+        tinted[:, :, c] = lut[c][spine[:, :, c]]
     return tinted
 
-def load_and_scale_spine(spine_path, yellow_color=None):
-    """Load spine template, scale to TARGET_HEIGHT, and optionally tint yellow.
+def scale_spine(spine, high_quality=False):
+    """Scale a decoded spine template to TARGET_HEIGHT, untinted.
+    Uses area averaging when shrinking and bicubic when enlarging, or
+    Lanczos if high_quality is set (for comparing against the old output).
 
     Returns: (scaled_spine, scale_factor, left_thin_x, right_thin_x)
-    where left_thin_x and right_thin_x are positions of thin lines in scaled spine.
     """
-    spine = cv2.imread(str(spine_path))
     h, w = spine.shape[:2]
 
     # Scale to TARGET_HEIGHT + 2 pixels, then crop 1 pixel from top and bottom
     # This ensures exactly 8 pixels of margin after cropping
     scale = (TARGET_HEIGHT + 2) / h
     new_w = int(w * scale)
-    scaled = cv2.resize(spine, (new_w, TARGET_HEIGHT + 2), interpolation=cv2.INTER_LANCZOS4)
+    if high_quality:
+        interpolation = cv2.INTER_LANCZOS4
+    else:
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+    scaled = cv2.resize(spine, (new_w, TARGET_HEIGHT + 2), interpolation=interpolation)
 
     # Crop 1 pixel from top and bottom
     scaled = scaled[1:-1, :, :]
-
-    # Tint with yellow color if provided
-    if yellow_color is not None:
-        scaled = tint_spine_yellow(scaled, yellow_color)
+    # Shared by every caller, so guard against in-place edits
+    scaled.flags.writeable = False
 
     # Calculate thin line positions in scaled spine
     left_thin_x = int(SPINE_LEFT_THIN_LINE * scale)
@@ -112,122 +134,183 @@ def load_and_scale_spine(spine_path, yellow_color=None):
 
     return scaled, scale, left_thin_x, right_thin_x
 
-def detect_page_angle(img):
-    """
-    Detect rotation angle from vertical border lines.
-    Returns angle needed to rotate the image to make borders vertical.
-    Positive = rotate clockwise, Negative = rotate counter-clockwise.
-    """
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray, 50, 150, apertureSize=3)
-
-    # High precision Hough transform
-    lines = cv2.HoughLines(edges, 1, np.pi/1440, threshold=300)
-
-    if lines is None:
-        return 0.0
+@lru_cache(maxsize=None)
+def _scale_spine(spine_path, mtime_ns, high_quality):
+    """Load and scale the spine template; cached per (path, mtime, high_quality)."""
+    return scale_spine(cv2.imread(str(spine_path)), high_quality)
 
-    vertical_angles = []
-    for line in lines[:200]:  # Check first 200 lines
-        rho, theta = line[0]
-        angle_deg = np.degrees(theta)
+def load_and_scale_spine_raw(spine_path, high_quality=False):
+    """Load spine template scaled to TARGET_HEIGHT, untinted.
 
-        # Near-vertical lines have theta near 0 or near 180
-        if angle_deg < 5:
-            vertical_angles.append(angle_deg)
-        elif angle_deg > 175:
-            vertical_angles.append(angle_deg - 180)
-
-    if not vertical_angles:
-        return 0.0
-
-    # The median angle tells us how much the lines are tilted from vertical
-    # To straighten, we rotate by the negative of this angle
-    median_angle = np.median(vertical_angles)
-    return median_angle  # Return the angle to correct (rotate by this amount)
+    The spine never changes between spreads, so the resize runs once
+    per process; editing the file on disk invalidates the cache.
+    """
+    spine_path = Path(spine_path)
+    return _scale_spine(spine_path, spine_path.stat().st_mtime_ns, high_quality)
 
-def deskew_image(img, angle):
-    """Rotate image to correct skew. Rotates by +angle to straighten."""
-    if abs(angle) < 0.01:
-        return img
+# Many scans have a dark shadow in the first few source pixels along the
+# image edge (up to 4 px, so 12 px on the 3x upscaled pages)
+EDGE_SHADOW_WIDTH = 12
 
-    h, w = img.shape[:2]
-    center = (w // 2, h // 2)
-    # Rotate by the angle to correct the tilt
-    M = cv2.getRotationMatrix2D(center, angle, 1.0)
+def detect_page_angle(gray, side):
+    """
+    Detect rotation angle from the thick outer border line of a grayscale page.
+    side is the page edge the outer border is on ('left' or 'right').
+    Returns angle needed to rotate the image to make the border vertical.
+    Positive = rotate counter-clockwise, Negative = rotate clockwise.
+
+    The border is the first dark column in from the outer edge, so instead of
+    Hough voting over the whole page, take the outermost dark pixel of each
+    row in a 100 px edge strip and fit a line through them. Pages where too
+    few rows have a usable hit fall back to the projection-profile estimator.
+    """
+    h, w = gray.shape
 
-    cos, sin = np.abs(M[0, 0]), np.abs(M[0, 1])
-    new_w = int(h * sin + w * cos)
-    new_h = int(h * cos + w * sin)
-    M[0, 2] += (new_w - w) / 2
-    M[1, 2] += (new_h - h) / 2
+    # Skip the top and bottom tenth, where the horizontal borders are dark too
+    rows = gray[h // 10:h - h // 10]
+    strip = rows[:, :100] if side == 'left' else rows[:, :w - 101:-1]
+
+    # Outermost pixel darker than 130 in each row (argmax finds the first hit)
+    _, dark = cv2.threshold(strip, 129, 1, cv2.THRESH_BINARY_INV)
+    xs = dark.argmax(axis=1)
+    ys = np.arange(len(xs))
+    # Hits against the image edge are scan shadow or a border clipped by the
+    # edge; either way they don't follow the border's tilt
+    valid = (dark[ys, xs] > 0) & (xs >= EDGE_SHADOW_WIDTH)
+
+    # Too few rows with a clear border: use the whole-page projection profile
+    if np.count_nonzero(valid) < len(ys) // 4:
+        return detect_border_angle_projection(cv2.pyrDown(cv2.pyrDown(gray)))
+
+    # Huber loss so rows where text or a stain comes first don't skew the fit
+    points = np.stack([xs[valid], ys[valid]], axis=1).astype(np.float32)
+    vx, vy, _, _ = cv2.fitLine(points, cv2.DIST_HUBER, 0, 0.01, 0.01).ravel()
+
+    # Tilt of the border from vertical; a right-edge strip is mirrored
+    tilt = np.degrees(np.arctan2(vx, vy))
+    if tilt > 90:
+        tilt -= 180
+    elif tilt < -90:
+        tilt += 180
+    return float(tilt if side == 'right' else -tilt)
+
+def warp_page(img, angle, src_left, src_top, src_w, src_h, new_w, new_h, region=None):
+    """
+    Deskew img by angle, crop the (src_left, src_top, src_w, src_h) region of
+    the deskewed page and resize it to (new_w, new_h), all in one warpAffine
+    so the full-size deskewed image is never materialized.
 
-    return cv2.warpAffine(img, M, (new_w, new_h),
+    If region (x, y, w, h) is given, only that window of the resized result
+    is rendered, e.g. the part that lands on the output canvas.
+    """
+    rx, ry, rw, rh = region if region is not None else (0, 0, new_w, new_h)
+    # Straight pages get no rotation, matching the unwarped detection gray
+    if abs(angle) < STRAIGHT_PAGE_ANGLE:
+        angle = 0.0
+    M, _ = deskew_matrix(img.shape, angle)
+    rotate = np.vstack([M, [0, 0, 1]])
+    # Output pixel -> deskewed pixel, with cv2.resize's pixel-center convention
+    sx, sy = src_w / new_w, src_h / new_h
+    crop_scale = np.float64([[sx, 0, src_left + (rx + 0.5) * sx - 0.5],
+                             [0, sy, src_top + (ry + 0.5) * sy - 0.5],
+                             [0, 0, 1]])
+    # Output pixel -> original pixel
+    inverse_map = np.linalg.inv(rotate) @ crop_scale
+    return cv2.warpAffine(img, inverse_map[:2], (rw, rh),
+                          flags=cv2.INTER_CUBIC | cv2.WARP_INVERSE_MAP,
                           borderMode=cv2.BORDER_CONSTANT,
                           borderValue=(255, 255, 255))
 
-def find_top_border(img):
+def _composite_numpy(dst, src):
+    """Copy the non-white pixels of src over dst (same shape) in place."""
+    # Not white: mean < 245, i.e. channel sum < 735 (no float conversion)
+    mask = src.sum(axis=2, dtype=np.uint16) < 735
+    # One SIMD masked copy into the dst view, rather than gathering src[mask]
+    # and scattering it; the bool mask is reused as uint8 without a copy
+    cv2.copyTo(src, mask.view(np.uint8), dst)
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def composite(dst, src):
+        """Copy the non-white pixels of src over dst (same shape) in place."""
+        h, w, channels = src.shape
+        for y in prange(h):
+            for x in range(w):
+                total = 0
+                for c in range(channels):
+                    total += src[y, x, c]
+                if total < 735:
+                    for c in range(channels):
+                        dst[y, x, c] = src[y, x, c]
+else:
+    composite = _composite_numpy
+
+def first_below(values, threshold):
+    """Index of the first entry of values below threshold, or None."""
+    mask = values < threshold
+    idx = int(mask.argmax())
+    return idx if mask[idx] else None
+
+def row_brightness_sums(gray):
+    """Brightness sum of each row (mean * width, kept in integers)."""
+    # cv2.reduce sums into int32 with SIMD instead of NumPy's widening reduction
+    return cv2.reduce(gray, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
+
+def dark_row_counts(gray, border_threshold=130):
+    """Number of pixels darker than border_threshold in each row."""
+    _, dark = cv2.threshold(gray, border_threshold - 1, 1, cv2.THRESH_BINARY_INV)
+    return cv2.reduce(dark, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
+
+def find_top_border(gray):
     """Find y-coordinate of top horizontal black border line.
     Returns the first row that is clearly part of the border (not yellow paper).
 
     The black border should have brightness < 130. We look for the first
-    row that drops below this absolute threshold, skipping any gradient
-    from deskewing.
+    row where most pixels are below this absolute threshold, skipping any
+    gradient from deskewing.
     """
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     h, w = gray.shape
 
-    # Get mean brightness of each row
-    row_brightness = np.mean(gray, axis=1)
-
     # Look for the black border (absolute brightness < 130)
     # The actual black border is very dark (typically 80-120)
-    border_threshold = 130
-
+    # Only the top band is searched, so only it is thresholded and reduced
     search_end = min(150, h)
-    for y in range(search_end):
-        if row_brightness[y] < border_threshold:
-            return y
+    hit = dark_row_counts(gray[:search_end]) > w // 2
+    if hit.any():
+        return int(hit.argmax())
 
     # Fallback: use relative threshold from the darkest row
-    min_brightness = np.min(row_brightness[:search_end])
-    threshold = min_brightness + 20
-    for y in range(search_end):
-        if row_brightness[y] < threshold:
-            return y
+    head = row_brightness_sums(gray[:search_end])
+    y = first_below(head, int(head.min()) + 20 * w)
+    if y is not None:
+        return y
 
     return 0
 
-def find_bottom_border(img):
+def find_bottom_border(gray):
     """Find y-coordinate of bottom horizontal black border line.
     Returns the last row that is clearly part of the border (not yellow paper).
 
     The black border should have brightness < 130.
     """
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     h, w = gray.shape
 
-    # Get mean brightness of each row
-    row_brightness = np.mean(gray, axis=1)
-
     # Look for the black border (absolute brightness < 130)
-    border_threshold = 130
-
+    # Scan upward from the bottom edge, reducing only the bottom band
     search_start = max(0, h - 150)
-    for y in range(h - 1, search_start - 1, -1):
-        if row_brightness[y] < border_threshold:
-            return y
+    hit = dark_row_counts(gray[search_start:])[::-1] > w // 2
+    if hit.any():
+        return h - 1 - int(hit.argmax())
 
     # Fallback: use relative threshold
-    min_brightness = np.min(row_brightness[search_start:])
-    threshold = min_brightness + 20
-    for y in range(h - 1, search_start - 1, -1):
-        if row_brightness[y] < threshold:
-            return y
+    tail = row_brightness_sums(gray[search_start:])[::-1]
+    i = first_below(tail, int(tail.min()) + 20 * w)
+    if i is not None:
+        return h - 1 - i
 
     return h - 1
 
-def find_black_border_edge(img, side, debug=False):
+def find_black_border_edge(gray, side, debug=False):
     """
     Find the x-position where the black border starts.
     Uses brightness profile to find the transition between yellow paper and border.
@@ -235,45 +318,49 @@ def find_black_border_edge(img, side, debug=False):
 
     Returns x position of the black border edge.
     """
-    h, w = img.shape[:2]
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if len(img.shape) == 3 else img
-
-    # Get mean brightness of each column
-    col_brightness = np.mean(gray, axis=0)
+    h, w = gray.shape
 
+    # Only the outer 100 columns are searched, so only they are reduced
+    # to brightness sums (mean * h, kept in integers)
     if side == 'left':
         # Scan leftmost region, find the darkest column
         search_end = min(100, w)
-        region = col_brightness[:search_end]
-        min_brightness = np.min(region)
+        region = cv2.reduce(gray[:, :search_end], 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
         # Tighter threshold (min + 20 instead of + 30) = more generous margin
-        threshold = min_brightness + 20
-        for x in range(search_end):
-            if col_brightness[x] < threshold:
-                if debug:
-                    print(f"    Black border (left) at x={x}, brightness={col_brightness[x]:.0f}, threshold={threshold:.0f}")
-                return x
-        return 0
+        threshold = int(region.min()) + 20 * h
+        x = first_below(region, threshold)
+        if x is None:
+            return 0
+        i = x
     else:
-        # Scan rightmost region
+        # Scan rightmost region, from the right edge inward
         search_start = max(0, w - 100)
-        region = col_brightness[search_start:]
-        min_brightness = np.min(region)
+        region = cv2.reduce(gray[:, search_start:], 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()[::-1]
         # Tighter threshold = more generous margin
-        threshold = min_brightness + 20
-        for x in range(w - 1, search_start - 1, -1):
-            if col_brightness[x] < threshold:
-                if debug:
-                    print(f"    Black border (right) at x={x}, brightness={col_brightness[x]:.0f}, threshold={threshold:.0f}")
-                return x
-        return w - 1
+        threshold = int(region.min()) + 20 * h
+        i = first_below(region, threshold)
+        if i is None:
+            return w - 1
+        x = w - 1 - i
+
+    if debug:
+        print(f"    Black border ({side}) at x={x}, brightness={region[i] / h:.0f}, threshold={threshold / h:.0f}")
+    return x
+
+# Column profile shape of the thin spine line: a V-shaped dip about 5 columns
+# wide on the 3x upscaled pages, with bright paper either side. Matched with
+# TM_CCOEFF_NORMED, so only the shape matters, not the brightness of the paper
+# or how dark the line is.
+THIN_LINE_TEMPLATE = np.float32([[1, 1, 1, 0.66, 0.33, 0, 0.33, 0.66, 1, 1, 1]])
+THIN_LINE_MIN_SCORE = 0.8
 
 def find_thin_spine_line(img_gray, side, search_start, search_end):
     """
     Find the x-position of the thin vertical spine border line.
 
     Strategy:
-    1. Look for a clear thin line (very dark column < 145 brightness)
+    1. Look for a clear thin line (a dip shaped like THIN_LINE_TEMPLATE
+       whose center column is very dark, < 145 brightness)
     2. If no clear thin line, find the transition from yellow to darker content
 
     Returns (x_position, darkness_value).
@@ -282,32 +369,133 @@ def find_thin_spine_line(img_gray, side, search_start, search_end):
 
     start = max(0, search_start)
     end = min(w, search_end)
-    col_means = np.mean(img_gray[:, start:end], axis=0)
+    # Column sums (mean * h) rather than means: the threshold scales with h and
+    # the correlation is scale-invariant, so nothing needs dividing. Sums of
+    # uint8 are exact in float32 up to 2**24, and matchTemplate takes it as is.
+    col_sums = cv2.reduce(img_gray[:, start:end], 0, cv2.REDUCE_SUM, dtype=cv2.CV_32F)
 
     # First, look for a clear thin line (brightness < 145)
-    # This should be surrounded by brighter pixels
+    # This should be surrounded by brighter pixels: correlate the column
+    # profile with the thin line template and check the best match is dark
     thin_line_threshold = 145
-    candidates = []
-    for i in range(5, len(col_means) - 5):
-        if col_means[i] < thin_line_threshold:
-            # Check if surrounded by brighter pixels
-            left_bright = np.mean(col_means[max(0, i-5):i]) > 160
-            right_bright = np.mean(col_means[i+1:min(len(col_means), i+6)]) > 160
-            if left_bright or right_bright:
-                candidates.append((i, col_means[i]))
-
-    if candidates:
-        # Use the darkest candidate
-        candidates.sort(key=lambda x: x[1])
-        best_idx, best_val = candidates[0]
-        return start + best_idx, best_val
+    tw = THIN_LINE_TEMPLATE.shape[1]
+    if col_sums.shape[1] >= tw:
+        scores = cv2.matchTemplate(col_sums, THIN_LINE_TEMPLATE, cv2.TM_CCOEFF_NORMED)
+        _, best_score, _, (best_loc, _) = cv2.minMaxLoc(scores)
+        best_idx = best_loc + tw // 2
+        if best_score > THIN_LINE_MIN_SCORE and col_sums[0, best_idx] < thin_line_threshold * h:
+            return start + best_idx, col_sums[0, best_idx] / h
 
     # No clear thin line found - use the darkest column in the search region
     # but bias toward columns that are near transitions (not at the very edge)
-    darkest_local = np.argmin(col_means)
-    return start + darkest_local, col_means[darkest_local]
+    darkest_local = int(col_sums.argmin())
+    return start + darkest_local, col_sums[0, darkest_local] / h
 
-def stitch_with_spine(right_page_path, left_page_path, spine_path, output_path, debug=False):
+def transform_page(page_img, page_name, is_right_page, target_thin_x, target_thick_x, debug=False):
+    """
+    Deskew and scale one page so its thin spine line lands on target_thin_x
+    and its thick border on target_thick_x in the output.
+
+    Returns (log_lines, roi, y0, x0): the part of the transformed page that
+    falls on the output canvas (None if nothing does) and its top-left corner.
+    Log lines are returned rather than printed so the two pages of a spread
+    can be transformed concurrently without interleaving their output.
+    """
+    # Detect tilt. Grayscale is converted once and shared by all the
+    # detectors; only the single-channel gray is deskewed for them; the
+    # color page is deskewed together with the crop and scale below.
+    gray = cv2.cvtColor(page_img, cv2.COLOR_BGR2GRAY)
+    angle = detect_page_angle(gray, 'right' if is_right_page else 'left')
+    gray = deskew_image(gray, angle, min_angle=STRAIGHT_PAGE_ANGLE)
+    h, w = gray.shape
+
+    # Find borders
+    top_border = find_top_border(gray)
+    bottom_border = find_bottom_border(gray)
+
+    if is_right_page:
+        # Right page: spine on LEFT, outer border on RIGHT
+        thin_line_x, _ = find_thin_spine_line(gray, 'left', 0, 60)
+        thick_border_x = find_black_border_edge(gray, 'right', debug)
+    else:
+        # Left page: spine on RIGHT, outer border on LEFT
+        thin_line_x, _ = find_thin_spine_line(gray, 'right', w - 60, w)
+        thick_border_x = find_black_border_edge(gray, 'left', debug)
+
+    log = [f"  {page_name.capitalize()} page: angle={angle:.2f}°, thin_line={thin_line_x}, thick_border={thick_border_x}",
+           f"    top/bottom borders: [{top_border}, {bottom_border}]"]
+
+    # Calculate vertical scale: fit content between margins
+    page_content_h = bottom_border - top_border
+    target_content_h = TARGET_HEIGHT - 2 * YELLOW_MARGIN
+    scale_y = target_content_h / page_content_h
+
+    # Calculate horizontal scale: align thin line AND place thick border at margin
+    if is_right_page:
+        # Distance from thin line to thick border in source
+        src_span = thick_border_x - thin_line_x
+        # Distance from target thin line to target thick border
+        dst_span = target_thick_x - target_thin_x
+    else:
+        # Distance from thick border to thin line in source
+        src_span = thin_line_x - thick_border_x
+        # Distance from target thick border to target thin line
+        dst_span = target_thin_x - target_thick_x
+
+    scale_x = dst_span / src_span if src_span > 0 else 1.0
+
+    log.append(f"    Scale: x={scale_x:.4f}, y={scale_y:.4f}")
+
+    # Extract the content region (with margin for yellow paper)
+    src_top = max(0, top_border - int(YELLOW_MARGIN / scale_y))
+    src_bottom = min(h, bottom_border + int(YELLOW_MARGIN / scale_y))
+
+    if is_right_page:
+        # Include from left edge (thin line side) to thick border + margin
+        src_left = 0
+        src_right = min(w, thick_border_x + int(YELLOW_MARGIN / scale_x))
+    else:
+        # Include from thick border - margin to right edge (thin line side)
+        src_left = max(0, thick_border_x - int(YELLOW_MARGIN / scale_x))
+        src_right = w
+
+    src_h = src_bottom - src_top
+    src_w = src_right - src_left
+
+    # Size of the content once scaled
+    new_h = int(src_h * scale_y)
+    new_w = int(src_w * scale_x)
+
+    # Calculate placement in output
+    # The thin line position after scaling
+    if is_right_page:
+        scaled_thin_x = int((thin_line_x - src_left) * scale_x)
+        # Place so thin line aligns with target
+        dst_x = target_thin_x - scaled_thin_x
+    else:
+        scaled_thin_x = int((thin_line_x - src_left) * scale_x)
+        dst_x = target_thin_x - scaled_thin_x
+
+    # Vertical: center the content
+    scaled_top_border = int((top_border - src_top) * scale_y)
+    dst_y = YELLOW_MARGIN - scaled_top_border
+
+    log.append(f"    Scaled size: {new_h}x{new_w}, placement: ({dst_y}, {dst_x})")
+
+    # Clip the placement rectangle to the output canvas
+    y0, y1 = max(0, dst_y), min(TARGET_HEIGHT, dst_y + new_h)
+    x0, x1 = max(0, dst_x), min(TARGET_WIDTH, dst_x + new_w)
+    if y1 <= y0 or x1 <= x0:
+        return log, None, y0, x0
+
+    # Deskew, crop and scale with one bicubic warp, rendering only
+    # the part of the scaled content that lands on the canvas
+    roi = warp_page(page_img, angle, src_left, src_top, src_w, src_h, new_w, new_h,
+                    region=(x0 - dst_x, y0 - dst_y, x1 - x0, y1 - y0))
+    return log, roi, y0, x0
+
+def stitch_with_spine(right_page_path, left_page_path, spine_path, output_path, debug=False,
+                      canvas=None, scaled_spine=None, page_threads=2):
     """
     Stitch two pages with the spine template filling in the center.
 
@@ -317,6 +505,13 @@ def stitch_with_spine(right_page_path, left_page_path, spine_path, output_path,
     Each page is transformed (deskewed + scaled) to:
     - Align its thin border with the spine's thin border
     - Place its thick border at exactly YELLOW_MARGIN pixels from the edge
+
+    If canvas (a TARGET_HEIGHT x TARGET_WIDTH x 3 uint8 array) is given, the
+    spread is drawn into it instead of a fresh allocation and returned.
+    scaled_spine, the result of load_and_scale_spine_raw(spine_path), may be
+    passed in so the spine isn't loaded again. page_threads is how many
+    threads transform the two pages; pool workers pass 1, since the pool
+    already keeps every core busy.
     """
     print(f"Stitching: {right_page_path.name} + {left_page_path.name}")
 
@@ -335,7 +530,10 @@ def stitch_with_spine(right_page_path, left_page_path, spine_path, output_path,
     print(f"  Yellow color (BGR): {yellow_color}")
 
     # Load spine scaled to TARGET_HEIGHT, get thin line positions
-    spine, spine_scale, spine_left_thin, spine_right_thin = load_and_scale_spine(spine_path, yellow_color)
+    if scaled_spine is None:
+        scaled_spine = load_and_scale_spine_raw(spine_path)
+    spine, spine_scale, spine_left_thin, spine_right_thin = scaled_spine
+    spine = tint_spine_yellow(spine, yellow_color)
     spine_h, spine_w = spine.shape[:2]
     print(f"  Spine: {spine_h}x{spine_w}, thin lines at x={spine_left_thin},{spine_right_thin}")
 
@@ -346,112 +544,35 @@ def stitch_with_spine(right_page_path, left_page_path, spine_path, output_path,
     print(f"  Spine position: x={spine_start_x} to {spine_start_x + spine_w}")
     print(f"  Spine thin lines in output: left={spine_left_thin_in_output}, right={spine_right_thin_in_output}")
 
-    # Create output canvas
-    output = np.ones((TARGET_HEIGHT, TARGET_WIDTH, 3), dtype=np.uint8) * 255
+    # Create output canvas. The spine covers its band completely, so only
+    # the area around it needs whitening
+    if canvas is None:
+        output = np.empty((TARGET_HEIGHT, TARGET_WIDTH, 3), dtype=np.uint8)
+    else:
+        output = canvas
+    output[:, :spine_start_x] = 255
+    output[:, spine_start_x+spine_w:] = 255
+    output[spine_h:, spine_start_x:spine_start_x+spine_w] = 255
 
     # Place spine in center (background layer)
     output[:spine_h, spine_start_x:spine_start_x+spine_w] = spine
 
-    # Process each page
-    for page_img, page_name, is_right_page in [
-        (right_img, "right", True),
-        (left_img, "left", False)
-    ]:
-        # Detect and correct tilt
-        angle = detect_page_angle(page_img)
-        page_img = deskew_image(page_img, angle)
-        h, w = page_img.shape[:2]
-        gray = cv2.cvtColor(page_img, cv2.COLOR_BGR2GRAY)
-
-        # Find borders
-        top_border = find_top_border(page_img)
-        bottom_border = find_bottom_border(page_img)
-
-        if is_right_page:
-            # Right page: spine on LEFT, outer border on RIGHT
-            thin_line_x, _ = find_thin_spine_line(gray, 'left', 0, 60)
-            thick_border_x = find_black_border_edge(page_img, 'right', debug)
-            target_thin_x = spine_right_thin_in_output
-            target_thick_x = TARGET_WIDTH - YELLOW_MARGIN
-        else:
-            # Left page: spine on RIGHT, outer border on LEFT
-            thin_line_x, _ = find_thin_spine_line(gray, 'right', w - 60, w)
-            thick_border_x = find_black_border_edge(page_img, 'left', debug)
-            target_thin_x = spine_left_thin_in_output
-            target_thick_x = YELLOW_MARGIN
-
-        print(f"  {page_name.capitalize()} page: angle={angle:.2f}°, thin_line={thin_line_x}, thick_border={thick_border_x}")
-        print(f"    top/bottom borders: [{top_border}, {bottom_border}]")
-
-        # Calculate vertical scale: fit content between margins
-        page_content_h = bottom_border - top_border
-        target_content_h = TARGET_HEIGHT - 2 * YELLOW_MARGIN
-        scale_y = target_content_h / page_content_h
-
-        # Calculate horizontal scale: align thin line AND place thick border at margin
-        if is_right_page:
-            # Distance from thin line to thick border in source
-            src_span = thick_border_x - thin_line_x
-            # Distance from target thin line to target thick border
-            dst_span = target_thick_x - target_thin_x
-        else:
-            # Distance from thick border to thin line in source
-            src_span = thin_line_x - thick_border_x
-            # Distance from target thick border to target thin line
-            dst_span = target_thin_x - target_thick_x
-
-        scale_x = dst_span / src_span if src_span > 0 else 1.0
-
-        print(f"    Scale: x={scale_x:.4f}, y={scale_y:.4f}")
-
-        # Extract the content region (with margin for yellow paper)
-        src_top = max(0, top_border - int(YELLOW_MARGIN / scale_y))
-        src_bottom = min(h, bottom_border + int(YELLOW_MARGIN / scale_y))
-
-        if is_right_page:
-            # Include from left edge (thin line side) to thick border + margin
-            src_left = 0
-            src_right = min(w, thick_border_x + int(YELLOW_MARGIN / scale_x))
-        else:
-            # Include from thick border - margin to right edge (thin line side)
-            src_left = max(0, thick_border_x - int(YELLOW_MARGIN / scale_x))
-            src_right = w
-
-        content = page_img[src_top:src_bottom, src_left:src_right]
-
-        # Scale the content
-        new_h = int(content.shape[0] * scale_y)
-        new_w = int(content.shape[1] * scale_x)
-        scaled = cv2.resize(content, (new_w, new_h), interpolation=cv2.INTER_LANCZOS4)
-
-        # Calculate placement in output
-        # The thin line position after scaling
-        if is_right_page:
-            scaled_thin_x = int((thin_line_x - src_left) * scale_x)
-            # Place so thin line aligns with target
-            dst_x = target_thin_x - scaled_thin_x
-        else:
-            scaled_thin_x = int((thin_line_x - src_left) * scale_x)
-            dst_x = target_thin_x - scaled_thin_x
-
-        # Vertical: center the content
-        scaled_top_border = int((top_border - src_top) * scale_y)
-        dst_y = YELLOW_MARGIN - scaled_top_border
-
-        print(f"    Scaled size: {new_h}x{new_w}, placement: ({dst_y}, {dst_x})")
-
-        # Composite onto output (non-white pixels overlay)
-        for sy in range(new_h):
-            dy = dst_y + sy
-            if dy < 0 or dy >= TARGET_HEIGHT:
-                continue
-            for sx in range(new_w):
-                dx = dst_x + sx
-                if dx < 0 or dx >= TARGET_WIDTH:
-                    continue
-                pixel = scaled[sy, sx]
-                if np.mean(pixel) < 245:  # Not white
-                    output[dy, dx] = pixel
+    page_jobs = [(right_img, "right", True, spine_right_thin_in_output,
+                  TARGET_WIDTH - YELLOW_MARGIN, debug),
+                 (left_img, "left", False, spine_left_thin_in_output, YELLOW_MARGIN, debug)]
+    if page_threads > 1:
+        # Transform both pages at once: OpenCV releases the GIL, so two
+        # threads keep two cores busy until the composite
+        with ThreadPoolExecutor(max_workers=page_threads) as executor:
+            placements = list(executor.map(lambda job: transform_page(*job), page_jobs))
+    else:
+        placements = [transform_page(*job) for job in page_jobs]
+
+    # Composite onto output (non-white pixels overlay), right page first
+    for log, roi, y0, x0 in placements:
+        print("\n".join(log))
+        if roi is not None:
+            composite(output[y0:y0 + roi.shape[0], x0:x0 + roi.shape[1]], roi)
 
     if debug:
         cv2.imwrite('debug_spine_scaled.png', spine)
@@ -462,43 +583,43 @@ def stitch_with_spine(right_page_path, left_page_path, spine_path, output_path,
 
     return output
 
+_worker_canvas = None
+_worker_spine = None
+
+def init_worker(scaled_spine):
+    """
+    Limit OpenCV and numba to one thread per worker; the pool supplies the
+    parallelism. Each worker also gets one output canvas, reused for every spread it
+    stitches, and the scaled spine that main() prepared.
+    """
+    global _worker_canvas, _worker_spine
+    cv2.setNumThreads(1)
+    if njit is not None:
+        set_num_threads(1)
+    _worker_canvas = np.empty((TARGET_HEIGHT, TARGET_WIDTH, 3), dtype=np.uint8)
+    _worker_spine = scaled_spine
+
+def stitch_with_spine_worker(task):
+    """Pool entry point: task is (right_path, left_path, spine_path, output_path)."""
+    stitch_with_spine(*task, debug=False, canvas=_worker_canvas, scaled_spine=_worker_spine,
+                      page_threads=1)
+    print()
+
 def main():
     base_dir = Path("sources_upscaled")
     output_dir = Path("spreads")
     output_dir.mkdir(exist_ok=True)
 
     spine_path = Path("spine_padded.png")
-
-    # Process multiple page pairs
-    # In Chinese right-to-left order: odd page (right) + even page (left)
-    page_pairs = [
-        (1003, 1004),
-        (1005, 1006),
-        (1007, 1008),
-        (1009, 1010),
-        (1011, 1012),
-        (1013, 1014),
-        (1015, 1016),
-        (1017, 1018),
-        (1019, 1020),
-        (1021, 1022),
-        (1023, 1024),
-    ]
-
-    for right_num, left_num in page_pairs:
-        right_page = base_dir / f"page{right_num}_3.0x.png"
-        left_page = base_dir / f"page{left_num}_3.0x.png"
-        output = output_dir / f"spread_{right_num}_{left_num}.png"
-
-        if not right_page.exists():
-            print(f"Skipping: {right_page.name} not found")
-            continue
-        if not left_page.exists():
-            print(f"Skipping: {left_page.name} not found")
-            continue
-
-        stitch_with_spine(right_page, left_page, spine_path, output, debug=False)
-        print()
+    # Decode and scale the spine once; workers only apply their tint
+    scaled_spine = load_and_scale_spine_raw(spine_path)
+
+    # Spreads are independent, so stitch them in parallel, one per process
+    tasks = [(right_page, left_page, spine_path, output)
+             for right_page, left_page, output in spread_tasks(base_dir, output_dir)]
+    worker_count = max(1, min(len(tasks), os.cpu_count() or 1))
+    with Pool(worker_count, initializer=init_worker, initargs=(scaled_spine,)) as pool:
+        pool.map(stitch_with_spine_worker, tasks, chunksize=1)
 
 if __name__ == "__main__":
     main()
@@ -1,29 +1,43 @@
 #!/usr/bin/env python3
 """
-Test PaddleOCR on a restored genealogy image.
+Test PaddleOCR on restored genealogy images.
+Usage: test_ocr.py [image ...]  (defaults to one test page)
 """
 
+import sys
 import json
+from pathlib import Path
+
+import numpy as np
+import paddle
 from paddleocr import PaddleOCR
 
+# Run the detector and recognizer on the GPU when there is one
+if paddle.device.is_compiled_with_cuda() and paddle.device.cuda.device_count() > 0:
+    device = 'gpu'
+else:
+    device = 'cpu'
+
 # Initialize OCR - disable document preprocessing
 ocr = PaddleOCR(
     lang='ch',
+    device=device,
     use_doc_orientation_classify=False,
     use_doc_unwarping=False,
     use_textline_orientation=False,
+    text_recognition_batch_size=16,  # recognize text lines 16 at a time
 )
 
-# Test on one image
-img_path = 'sources_upscaled/page1000_3.0x.png'
+img_paths = sys.argv[1:] or ['sources_upscaled/page1000_3.0x.png']
 
-print(f"Processing: {img_path}")
+print(f"Processing {len(img_paths)} image(s) on {device}")
 print("=" * 60)
 
-result = ocr.predict(img_path)
+# One predict call for all images, so pages are batched through the models
+results = ocr.predict(img_paths)
 
-if result and len(result) > 0:
-    ocr_result = result[0]
+for img_path, ocr_result in zip(img_paths, results):
+    print(f"\nImage: {img_path}")
 
     texts = ocr_result.get('rec_texts', [])
     scores = ocr_result.get('rec_scores', [])
@@ -35,14 +49,13 @@ if result and len(result) > 0:
     output = []
     for i, (text, score, poly) in enumerate(zip(texts, scores, polys)):
         # Get bounding box from polygon
-        poly_list = poly.tolist() if hasattr(poly, 'tolist') else list(poly)
-        xs = [p[0] for p in poly_list]
-        ys = [p[1] for p in poly_list]
+        pts = np.asarray(poly)
+        (x_min, y_min), (x_max, y_max) = pts.min(axis=0).tolist(), pts.max(axis=0).tolist()
         bbox = {
-            'x_min': min(xs),
-            'y_min': min(ys),
-            'x_max': max(xs),
-            'y_max': max(ys)
+            'x_min': x_min,
+            'y_min': y_min,
+            'x_max': x_max,
+            'y_max': y_max
         }
 
         # Estimate character positions (interpolate along text line)
@@ -50,22 +63,20 @@ if result and len(result) > 0:
         char_positions = []
         if num_chars > 0:
             # Determine if vertical or horizontal based on aspect ratio
-            width = bbox['x_max'] - bbox['x_min']
-            height = bbox['y_max'] - bbox['y_min']
-
-            for j, char in enumerate(text):
-                if height > width:  # Vertical text
-                    char_y = bbox['y_min'] + height * (j + 0.5) / num_chars
-                    char_x = (bbox['x_min'] + bbox['x_max']) / 2
-                else:  # Horizontal text
-                    char_x = bbox['x_min'] + width * (j + 0.5) / num_chars
-                    char_y = (bbox['y_min'] + bbox['y_max']) / 2
-
-                char_positions.append({
-                    'char': char,
-                    'x': int(char_x),
-                    'y': int(char_y)
-                })
+            width = x_max - x_min
+            height = y_max - y_min
+
+            # Centers of num_chars equal slots along the line, all at once
+            slots = np.arange(num_chars) + 0.5
+            if height > width:  # Vertical text
+                char_ys = (y_min + height * slots / num_chars).astype(int)
+                char_xs = np.full(num_chars, int((x_min + x_max) / 2))
+            else:  # Horizontal text
+                char_xs = (x_min + width * slots / num_chars).astype(int)
+                char_ys = np.full(num_chars, int((y_min + y_max) / 2))
+
+            char_positions = [{'char': char, 'x': x, 'y': y}
+                              for char, x, y in zip(text, char_xs.tolist(), char_ys.tolist())]
 
         print(f"\n[{i+1}] Text: {text}")
         print(f"     Score: {score:.3f}")
@@ -81,14 +92,19 @@ if result and len(result) > 0:
         output.append({
             'text': text,
             'score': float(score),
-            'polygon': poly_list,
+            'polygon': pts.tolist(),
             'bbox': bbox,
             'char_positions': char_positions
         })
 
-    # Save to JSON
-    with open('ocr_result.json', 'w', encoding='utf-8') as f:
+    # Save to JSON (one file per image when testing several)
+    if len(img_paths) == 1:
+        json_path = 'ocr_result.json'
+    else:
+        json_path = f'ocr_result_{Path(img_path).stem}.json'
+    with open(json_path, 'w', encoding='utf-8') as f:
         json.dump(output, f, ensure_ascii=False, indent=2)
-    print(f"\n\nResults saved to ocr_result.json")
-else:
+    print(f"\n\nResults saved to {json_path}")
+
+if not results:
     print("No results returned")